@@ -0,0 +1,87 @@
+"""
+Benchmark of repeated reads of an input table with the columnar cache
+
+Compares parsing the CSV file on every pass with reading the columns from
+the columnar cache, the first cached pass includes the conversion.
+
+Usage:
+    python benchmarks/bench_columnar.py [rows] [passes]
+"""
+
+import csv
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from keboola import docker  # noqa: E402
+
+COLUMNS = ['id', 'name', 'price', 'category', 'note', 'created']
+
+
+def create_table(data_dir, rows):
+    os.makedirs(os.path.join(data_dir, 'in', 'tables'))
+    with open(os.path.join(data_dir, 'config.json'), 'w') as config_file:
+        json.dump({}, config_file)
+    path = os.path.join(data_dir, 'in', 'tables', 'table.csv')
+    with open(path, 'w', encoding='utf-8', newline='') as table_file:
+        writer = csv.writer(table_file, dialect='kbc')
+        writer.writerow(COLUMNS)
+        for i in range(rows):
+            writer.writerow([i, 'item ' + str(i), i * 1.5, 'cat-' + str(i % 7),
+                             'some "quoted", text', '2020-01-01 00:00:00'])
+    with open(path + '.manifest', 'w') as manifest_file:
+        json.dump({'id': 'in.c-main.table', 'columns': COLUMNS},
+                  manifest_file)
+
+
+def run(cfg, passes):
+    """
+    Run passes over the whole table and over two projected columns.
+
+    Returns:
+        List of (full read, projection) times of each pass.
+    """
+    times = []
+    for _ in range(passes):
+        start = time.perf_counter()
+        sum(1 for _ in cfg.read_input_table('table.csv'))
+        middle = time.perf_counter()
+        columns = cfg.get_input_table_columns('table.csv',
+                                              ['price', 'category'])
+        len(set(columns['category']))
+        times.append((middle - start, time.perf_counter() - middle))
+    return times
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    passes = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    data_dir = tempfile.mkdtemp('kbc-bench')
+    cache_dir = tempfile.mkdtemp('kbc-bench-cache')
+    try:
+        docker.Config.register_csv_dialect()
+        create_table(data_dir, rows)
+        csv_times = run(docker.Config(data_dir), passes)
+        cached_times = run(
+            docker.Config(data_dir, columnar_cache_dir=cache_dir), passes
+        )
+        print('{:<6} {:>14} {:>14} {:>14} {:>14}'.format(
+            'pass', 'csv read [s]', 'cached [s]',
+            'csv project [s]', 'cached [s]'))
+        for i, (csv_time, cached_time) in enumerate(
+                zip(csv_times, cached_times)):
+            print('{:<6} {:>14.3f} {:>14.3f} {:>14.3f} {:>14.3f}'.format(
+                i + 1, csv_time[0], cached_time[0],
+                csv_time[1], cached_time[1]))
+    finally:
+        shutil.rmtree(data_dir)
+        shutil.rmtree(cache_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Memory benchmark comparing plain dictionaries with descriptor records
+
+Usage:
+    python benchmarks/bench_descriptors.py [count]
+"""
+
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from keboola.docker.descriptors import (  # noqa: E402
+    InputTable, OutputTable, TableManifest
+)
+
+
+def input_table(i):
+    return {
+        'source': 'in.c-main.table-' + str(i),
+        'destination': 'table-' + str(i) + '.csv',
+        'columns': [],
+        'where_values': [],
+        'where_operator': 'eq',
+        'full_path': '/data/in/tables/table-' + str(i) + '.csv'
+    }
+
+
+def output_table(i):
+    return {
+        'source': 'result-' + str(i) + '.csv',
+        'destination': 'out.c-main.result-' + str(i),
+        'incremental': False,
+        'primary_key': [],
+        'delete_where_values': [],
+        'delete_where_operator': 'eq',
+        'full_path': '/data/out/tables/result-' + str(i) + '.csv'
+    }
+
+
+def table_manifest(i):
+    return {
+        'id': 'in.c-main.table-' + str(i),
+        'uri': 'https://connection.keboola.com/v2/storage/tables/' + str(i),
+        'name': 'table-' + str(i),
+        'primary_key': [],
+        'indexed_columns': [],
+        'created': '2015-11-02T09:11:37+0100',
+        'last_change_date': '2015-11-02T09:11:37+0100',
+        'last_import_date': '2015-11-02T09:11:37+0100',
+        'rows_count': i,
+        'data_size_bytes': 81920,
+        'is_alias': False,
+        'columns': ['id', 'name'],
+        'attributes': []
+    }
+
+
+def measure(factory, wrap, count):
+    """
+    Measure memory allocated by count records, values are built before
+    the measurement so only the containers are compared.
+    """
+    sources = [factory(i) for i in range(count)]
+    tracemalloc.start()
+    records = [wrap(source) for source in sources]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del records
+    return size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    print('{:<15} {:>12} {:>12} {:>7}'.format(
+        'record', 'dict [B]', 'slots [B]', 'ratio'))
+    for name, factory, descriptor_class in (
+            ('InputTable', input_table, InputTable),
+            ('OutputTable', output_table, OutputTable),
+            ('TableManifest', table_manifest, TableManifest)):
+        dict_size = measure(factory, dict, count)
+        slots_size = measure(factory, descriptor_class, count)
+        print('{:<15} {:>12} {:>12} {:>7.2f}'.format(
+            name, dict_size, slots_size, dict_size / slots_size))
+
+
+if __name__ == '__main__':
+    main()
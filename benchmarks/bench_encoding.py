@@ -0,0 +1,110 @@
+"""
+Benchmark of reading input tables with mixed encodings and dialects
+
+Compares the detected format fast path of Config.read_input_table with
+reading the table as UTF-8 and falling back to decoding it line by line
+after the first decoding error. Both paths use the real delimiter of the
+table and must return the same number of rows. The cost of detecting the
+format is reported separately from the read.
+
+Usage:
+    python benchmarks/bench_encoding.py [rows]
+"""
+
+import csv
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from keboola import docker  # noqa: E402
+
+TABLES = (
+    ('utf8.csv', 'utf-8', ','),
+    ('utf8-bom.csv', 'utf-8-sig', ','),
+    ('cp1252.csv', 'cp1252', ','),
+    ('cp1252-semicolon.csv', 'cp1252', ';'),
+    ('utf8-tab.csv', 'utf-8', '\t'),
+)
+
+
+def create_tables(data_dir, rows):
+    os.makedirs(os.path.join(data_dir, 'in', 'tables'))
+    with open(os.path.join(data_dir, 'config.json'), 'w') as config_file:
+        json.dump({}, config_file)
+    for name, encoding, delimiter in TABLES:
+        path = os.path.join(data_dir, 'in', 'tables', name)
+        with open(path, 'w', encoding=encoding, newline='') as table_file:
+            writer = csv.writer(table_file, delimiter=delimiter,
+                                lineterminator='\n')
+            writer.writerow(['id', 'name', 'price', 'note'])
+            for i in range(rows):
+                writer.writerow([i, 'item ' + str(i), i * 1.5, 'plain text'])
+            # non-ASCII data only at the end of the table
+            writer.writerow([rows, 'Crème brûlée', 0, 'café'])
+
+
+def read_fallback(path, delimiter):
+    """
+    Read the table as UTF-8, after a decoding error decode the whole table
+    again line by line in Python.
+    """
+    try:
+        with open(path, encoding='utf-8', newline='') as table_file:
+            return sum(1 for _ in csv.reader(table_file, dialect='kbc',
+                                             delimiter=delimiter))
+    except UnicodeDecodeError:
+        pass
+
+    def decode(lines):
+        for line in lines:
+            try:
+                yield line.decode('utf-8')
+            except UnicodeDecodeError:
+                yield line.decode('cp1252')
+
+    with open(path, 'rb') as table_file:
+        return sum(1 for _ in csv.reader(decode(table_file), dialect='kbc',
+                                         delimiter=delimiter))
+
+
+def read_detected(cfg, name):
+    return sum(1 for _ in cfg.read_input_table(name))
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    data_dir = tempfile.mkdtemp('kbc-bench')
+    try:
+        create_tables(data_dir, rows)
+        cfg = docker.Config(data_dir)
+        print('{:<22} {:>11} {:>13} {:>13}'.format(
+            'table', 'detect [s]', 'fallback [s]', 'detected [s]'))
+        for name, _, delimiter in TABLES:
+            path = os.path.join(data_dir, 'in', 'tables', name)
+            start = time.perf_counter()
+            fallback_rows = read_fallback(path, delimiter)
+            fallback = time.perf_counter() - start
+            start = time.perf_counter()
+            cfg.get_input_table_format(name)
+            detect = time.perf_counter() - start
+            start = time.perf_counter()
+            detected_rows = read_detected(cfg, name)
+            detected = time.perf_counter() - start
+            if fallback_rows != detected_rows:
+                raise AssertionError(
+                    name + ': ' + str(fallback_rows) + ' rows read by '
+                    'fallback, ' + str(detected_rows) + ' rows detected'
+                )
+            print('{:<22} {:>11.4f} {:>13.3f} {:>13.3f}'.format(
+                name, detect, fallback, detected))
+    finally:
+        shutil.rmtree(data_dir)
+
+
+if __name__ == '__main__':
+    main()
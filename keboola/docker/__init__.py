@@ -8,3 +8,8 @@ See docs: https://developers.keboola.com/extend/common-interface/
 """
 
 from .docker import Config
+from .columnar import ColumnarTable
+from .descriptors import (
+    InputTable, OutputTable, InputFile, TableManifest, FileManifest,
+    TableFormat
+)
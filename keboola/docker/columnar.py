@@ -0,0 +1,258 @@
+"""
+Columnar cache of input tables
+
+A table is converted once, chunk by chunk, into one binary file per column.
+Each chunk of a column holds the UTF-8 encoded values separated by NUL
+characters, the byte offsets of the chunks are stored in the table metadata.
+Rows are read from the memory-mapped column files one chunk at a time, so
+only a chunk of the selected columns is decoded and held in memory, and
+a projection does not touch the files of other columns at all. Tables
+containing NUL characters or rows with an unexpected number of values
+cannot be cached.
+"""
+
+import csv
+import itertools
+import json
+import mmap
+import os
+import shutil
+
+# increase when the layout of the cached files changes
+FORMAT_VERSION = 1
+CHUNK_SIZE = 10000
+SEPARATOR = '\x00'
+META_FILE = 'meta.json'
+
+
+class ColumnarTable(object):
+    """
+    Table stored in the columnar cache.
+    """
+    def __init__(self, path):
+        """
+        Args:
+            path: Directory with the cached table.
+        """
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as meta_file:
+            meta = json.load(meta_file)
+        self.columns = meta['columns']
+        self.rows_count = meta['rows_count']
+        self.source_stamp = meta['source_stamp']
+        self._offsets = meta['offsets']
+
+    @classmethod
+    def create(cls, path, rows, source_stamp=None, chunk_size=CHUNK_SIZE):
+        """
+        Convert rows of a table to the columnar format.
+
+        Args:
+            path: Directory for the cached table, replaced if it exists.
+            rows: Iterator of rows, each row is a list of strings, the first
+                row contains column names.
+            source_stamp: Identification of the source file version.
+            chunk_size: Number of rows converted at once.
+
+        Returns:
+            ColumnarTable.
+        """
+        rows = iter(rows)
+        columns = list(next(rows, []))
+        tmp_path = path + '.tmp-' + str(os.getpid())
+        if os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path)
+        os.makedirs(tmp_path)
+        files = [open(os.path.join(tmp_path, str(index)), 'wb')
+                 for index in range(len(columns))]
+        try:
+            rows_count, offsets = _write_columns(files, rows, chunk_size)
+        except Exception:
+            for column_file in files:
+                column_file.close()
+            shutil.rmtree(tmp_path)
+            raise
+        for column_file in files:
+            column_file.close()
+        with open(os.path.join(tmp_path, META_FILE), 'w') as meta_file:
+            json.dump({
+                'columns': columns,
+                'rows_count': rows_count,
+                'offsets': offsets,
+                'source_stamp': source_stamp
+            }, meta_file)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.rename(tmp_path, path)
+        return cls(path)
+
+    def column(self, name):
+        """
+        Get all values of a column. If more columns have the same name,
+        the first one is used.
+
+        Args:
+            name: Column name.
+
+        Returns:
+            List of strings.
+        """
+        chunks = self._read_chunks([self._get_index(name)])
+        return list(itertools.chain.from_iterable(
+            values[0] for values in chunks
+        ))
+
+    def read(self, columns=None):
+        """
+        Read rows of the table chunk by chunk, the first row contains column
+        names.
+
+        Args:
+            columns: List of column names to read, all columns by position
+                if not set. If more columns have the same name, the first
+                one is used.
+
+        Returns:
+            Iterator of rows, each row is a list of strings.
+        """
+        if columns is None:
+            columns = self.columns
+            indexes = list(range(len(columns)))
+        else:
+            indexes = [self._get_index(name) for name in columns]
+        return itertools.chain([list(columns)], self._read_rows(indexes))
+
+    def _get_index(self, name):
+        if name not in self.columns:
+            raise ValueError("Column " + name + " not found")
+        return self.columns.index(name)
+
+    def _read_rows(self, indexes):
+        if not indexes:
+            # zip() of no columns would not yield any rows
+            yield from ([] for _ in range(self.rows_count))
+            return
+        for values in self._read_chunks(indexes):
+            yield from map(list, zip(*values))
+
+    def _read_chunks(self, indexes):
+        """
+        Read values of columns chunk by chunk.
+
+        Args:
+            indexes: List of column indexes.
+
+        Returns:
+            Generator of lists with values of each column in a chunk.
+        """
+        files = []
+        data = []
+        try:
+            for index in indexes:
+                column_file = open(os.path.join(self.path, str(index)), 'rb')
+                files.append(column_file)
+                if os.fstat(column_file.fileno()).st_size:
+                    data.append(mmap.mmap(column_file.fileno(), 0,
+                                          access=mmap.ACCESS_READ))
+                else:
+                    data.append(b'')
+            starts = [0] * len(indexes)
+            for chunk_offsets in self._offsets:
+                values = []
+                for position, index in enumerate(indexes):
+                    end = chunk_offsets[index]
+                    values.append(str(data[position][starts[position]:end],
+                                      'utf-8').split(SEPARATOR))
+                    starts[position] = end
+                yield values
+        finally:
+            for column_data in data:
+                if isinstance(column_data, mmap.mmap):
+                    column_data.close()
+            for column_file in files:
+                column_file.close()
+
+
+def _write_columns(files, rows, chunk_size):
+    """
+    Write values of rows to column files chunk by chunk.
+
+    Returns:
+        Tuple with number of rows written and list of end offsets of all
+        columns in each chunk.
+    """
+    rows_count = 0
+    offsets = []
+    positions = [0] * len(files)
+    for chunk in iter(lambda: list(itertools.islice(rows, chunk_size)), []):
+        if set(map(len, chunk)) != {len(files)}:
+            raise ValueError("Rows must have " + str(len(files)) + " values")
+        for index, values in enumerate(zip(*chunk)):
+            data = SEPARATOR.join(values)
+            if data.count(SEPARATOR) != len(values) - 1:
+                raise ValueError("Values must not contain NUL")
+            positions[index] += files[index].write(data.encode('utf-8'))
+        offsets.append(list(positions))
+        rows_count += len(chunk)
+    return rows_count, offsets
+
+
+def get_source_stamp(source_path, columns=None, table_format=None):
+    """
+    Get identification of a source file version and of everything the cached
+    data depend on.
+
+    Args:
+        source_path: Path to the source file.
+        columns: Column names from the table manifest.
+        table_format: TableFormat used to read the source file.
+
+    Returns:
+        Dict which can be stored as JSON.
+    """
+    stat = os.stat(source_path)
+    stamp = {
+        'format_version': FORMAT_VERSION,
+        'path': os.path.abspath(source_path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'columns': list(columns) if columns else None,
+        'encoding': None,
+        'errors': None,
+        'dialect': None
+    }
+    if table_format is not None:
+        dialect = table_format['dialect']
+        if isinstance(dialect, str):
+            dialect = csv.get_dialect(dialect)
+        stamp['encoding'] = table_format['encoding']
+        stamp['errors'] = table_format['errors']
+        stamp['dialect'] = {
+            attribute: getattr(dialect, attribute)
+            for attribute in ('delimiter', 'quotechar', 'escapechar',
+                              'doublequote', 'skipinitialspace', 'quoting')
+        }
+    # round trip through JSON, so that it is equal to the stored stamp
+    return json.loads(json.dumps(stamp))
+
+
+def get_columnar_table(path, source_stamp, read_rows):
+    """
+    Get cached table, the table is converted if it is not cached yet
+    or if the stored stamp differs from source_stamp.
+
+    Args:
+        path: Directory for the cached table.
+        source_stamp: Stamp of the source file, see get_source_stamp.
+        read_rows: Callable returning iterator of rows of the source file,
+            the first row contains column names.
+
+    Returns:
+        ColumnarTable.
+    """
+    meta_path = os.path.join(path, META_FILE)
+    if os.path.isfile(meta_path):
+        with open(meta_path) as meta_file:
+            if json.load(meta_file).get('source_stamp') == source_stamp:
+                return ColumnarTable(path)
+    return ColumnarTable.create(path, read_rows(), source_stamp)
@@ -0,0 +1,203 @@
+"""
+Record types describing tables, files and manifests of KBC docker applications
+
+Records are immutable, keep their properties in __slots__ and support
+read-only dict style access. Nested lists and dictionaries are stored as
+read-only subclasses of list and dict. Unlike the plain dictionaries returned
+by previous versions of the library, records cannot be modified or passed to
+json.dump directly, use to_dict() to get a plain dictionary copy.
+"""
+
+from collections.abc import Mapping
+
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError(type(self).__name__ + " is immutable")
+
+
+class _FrozenList(list):
+    """
+    List which cannot be modified.
+    """
+    __slots__ = ()
+    append = extend = insert = remove = pop = clear = sort = reverse = \
+        __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+
+    def __reduce__(self):
+        return type(self), (list(self),)
+
+
+class _FrozenDict(dict):
+    """
+    Dictionary which cannot be modified.
+    """
+    __slots__ = ()
+    clear = pop = popitem = setdefault = update = \
+        __setitem__ = __delitem__ = __ior__ = _read_only
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+
+# empty values are common in configurations, being read-only they are shared
+_EMPTY_LIST = _FrozenList()
+_EMPTY_DICT = _FrozenDict()
+
+
+def _freeze(value):
+    """
+    Convert nested lists and dicts to their read-only variants.
+    """
+    if isinstance(value, list):
+        if not value:
+            return _EMPTY_LIST
+        return _FrozenList(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        if not value:
+            return _EMPTY_DICT
+        return _FrozenDict(
+            (key, _freeze(item)) for key, item in value.items()
+        )
+    return value
+
+
+def _thaw(value):
+    """
+    Convert values converted by _freeze back to plain lists and dicts.
+    """
+    if isinstance(value, list):
+        return [_thaw(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _thaw(item) for key, item in value.items()}
+    return value
+
+
+class Descriptor(Mapping):
+    """
+    Base class of the immutable records. Known properties are stored in
+    slots, any other properties are kept in a dictionary which is allocated
+    only when the source data contain such properties.
+    """
+    __slots__ = ('_extra',)
+    _fields = ()
+
+    def __init__(self, data=None, **properties):
+        """
+        Args:
+            data: Dictionary with record properties.
+            properties: Additional properties, they override the ones
+                from data.
+        """
+        extra = None
+        for source in (data or {}, properties):
+            for key, value in source.items():
+                if key in self._fields:
+                    object.__setattr__(self, key, _freeze(value))
+                else:
+                    if extra is None:
+                        extra = {}
+                    extra[key] = _freeze(value)
+        object.__setattr__(self, '_extra', extra)
+
+    def __getitem__(self, key):
+        if key in self._fields:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        for key in self._fields:
+            if hasattr(self, key):
+                yield key
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(type(self).__name__ + " is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(type(self).__name__ + " is immutable")
+
+    def __reduce__(self):
+        return type(self), (self.to_dict(),)
+
+    def __repr__(self):
+        return type(self).__name__ + '(' + repr(self.to_dict()) + ')'
+
+    def to_dict(self):
+        """
+        Get the record as a plain dictionary, nested lists and dicts
+        are copied, so the result can be modified or serialized to JSON.
+
+        Returns:
+            Dict with record properties.
+        """
+        return {key: _thaw(value) for key, value in self.items()}
+
+
+class InputTable(Descriptor):
+    """
+    Input table mapping from the configuration file, full_path is the
+    path of the table data in the data directory.
+    """
+    __slots__ = _fields = (
+        'source', 'destination', 'columns', 'where_column', 'where_values',
+        'where_operator', 'days', 'changed_since', 'limit', 'full_path'
+    )
+
+
+class OutputTable(Descriptor):
+    """
+    Output table mapping from the configuration file, full_path is the
+    path where the application is expected to write the table data.
+    """
+    __slots__ = _fields = (
+        'source', 'destination', 'incremental', 'primary_key', 'columns',
+        'delete_where_column', 'delete_where_values', 'delete_where_operator',
+        'delimiter', 'enclosure', 'metadata', 'column_metadata', 'full_path'
+    )
+
+
+class InputFile(Descriptor):
+    """
+    Input file present in the data directory.
+    """
+    __slots__ = _fields = ('file_name', 'full_path')
+
+
+class TableManifest(Descriptor):
+    """
+    Manifest of an input table.
+    """
+    __slots__ = _fields = (
+        'id', 'uri', 'name', 'primary_key', 'indexed_columns', 'created',
+        'last_change_date', 'last_import_date', 'rows_count',
+        'data_size_bytes', 'is_alias', 'columns', 'attributes', 'metadata',
+        'column_metadata'
+    )
+
+
+class FileManifest(Descriptor):
+    """
+    Manifest of an input file.
+    """
+    __slots__ = _fields = (
+        'id', 'name', 'created', 'is_public', 'is_encrypted', 'is_sliced',
+        'tags', 'max_age_days', 'size_bytes'
+    )
+
+
+class TableFormat(Descriptor):
+    """
+    Encoding, codec error handler and CSV dialect detected for an input
+    table. The dialect is either the name of a registered dialect or
+    a csv.Dialect subclass, both can be passed to csv.reader as they are.
+    """
+    __slots__ = _fields = ('encoding', 'errors', 'dialect')
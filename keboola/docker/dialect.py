@@ -0,0 +1,211 @@
+"""
+Detection of encoding and CSV dialect of input tables
+
+Encoding and dialect are detected from a small sample from the beginning
+of the table. Tables are read in a single pass by the C implementation of the
+detected codec and of the csv module. Bytes which are not valid in the detected
+encoding are decoded by the fallback error handler, first as cp1252 and then as
+latin-1, so a table mixing UTF-8 and cp1252 is read without
+a UnicodeDecodeError halfway through the file. Optionally, the whole table can
+be scanned in binary mode before reading. This doubles the disk reads but
+avoids calling the Python-level fallback handler for tables whose sample is
+plain ASCII but which contain cp1252 data later.
+"""
+
+import codecs
+import csv
+import re
+from .descriptors import TableFormat
+
+SAMPLE_SIZE = 65536
+# the sniffer is implemented in Python, it gets only the first rows
+DIALECT_SAMPLE_SIZE = 8192
+DELIMITERS = ',;\t|'
+FALLBACK_ERRORS = 'kbc-fallback'
+ASCII = bytes(range(128))
+NON_ASCII = re.compile(b'[\x80-\xff]')
+
+# UTF-32 has to be tested before UTF-16, the UTF-16 LE BOM is its prefix
+BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+def detect_encoding(sample):
+    """
+    Detect encoding of a sample of the table data.
+
+    Args:
+        sample: Bytes from the beginning of the table.
+
+    Returns:
+        String codec name.
+    """
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+    if sample[1::2].count(0) > len(sample) // 4:
+        return 'utf-16-le'
+    if sample[0::2].count(0) > len(sample) // 4:
+        return 'utf-16-be'
+    # the sample may end in the middle of a multi byte character
+    return detect_text_encoding([sample], final=False)
+
+
+def detect_dialect(text):
+    """
+    Detect CSV dialect of a sample of the table data.
+
+    Args:
+        text: Decoded sample from the beginning of the table.
+
+    Returns:
+        Name of the 'kbc' dialect if the sample matches it,
+        csv.Dialect subclass otherwise.
+    """
+    try:
+        sniffed = csv.Sniffer().sniff(text, delimiters=DELIMITERS)
+    except csv.Error:
+        return 'kbc'
+    delimiter = sniffed.delimiter
+    quotechar = sniffed.quotechar or '"'
+    if delimiter == ',' and quotechar == '"':
+        return 'kbc'
+    # doublequote is not trusted from the sniffer, it is guessed as False
+    # whenever the sample does not contain an escaped quote
+    return type('DetectedDialect', (csv.Dialect, ), {
+        'delimiter': delimiter,
+        'quotechar': quotechar,
+        'doublequote': True,
+        'skipinitialspace': False,
+        'lineterminator': '\n',
+        'quoting': csv.QUOTE_MINIMAL
+    })
+
+
+def decode_fallback(error):
+    """
+    Codec error handler decoding invalid bytes as cp1252, bytes undefined
+    in cp1252 are decoded as latin-1.
+
+    Args:
+        error: UnicodeDecodeError raised by the codec.
+
+    Returns:
+        Tuple with the decoded text and position to continue at.
+    """
+    if not isinstance(error, UnicodeDecodeError):
+        raise error
+    data = error.object[error.start:error.end]
+    try:
+        return data.decode('cp1252'), error.end
+    except UnicodeDecodeError:
+        return data.decode('latin-1'), error.end
+
+
+codecs.register_error(FALLBACK_ERRORS, decode_fallback)
+
+
+def detect_single_byte_encoding(data):
+    """
+    Detect encoding of data which is not valid UTF-8.
+
+    Returns:
+        'cp1252' if the data are valid cp1252, 'latin-1' otherwise.
+    """
+    try:
+        data.decode('cp1252')
+        return 'cp1252'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+
+def detect_text_encoding(chunks, final=True):
+    """
+    Detect encoding of text without BOM. All non-ASCII bytes are checked,
+    only UTF-8, cp1252 and latin-1 are considered.
+
+    Args:
+        chunks: Iterable of consecutive chunks of bytes.
+        final: False if the last chunk may end in the middle of a character.
+
+    Returns:
+        'utf-8' if the text is valid UTF-8 or if it contains valid non-ASCII
+        UTF-8 before the first invalid byte, the rest is then handled by the
+        fallback error handler. Otherwise 'cp1252' or 'latin-1' detected from
+        the chunk with the first invalid byte.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    utf8_seen = False
+    for chunk in chunks:
+        # deleting ASCII bytes is much faster than a regular expression
+        # search and almost all chunks are expected to be plain ASCII
+        if not chunk.translate(None, ASCII) and not decoder.getstate()[0]:
+            continue
+        try:
+            text = decoder.decode(chunk)
+        except UnicodeDecodeError as error:
+            first = NON_ASCII.search(chunk)
+            if utf8_seen or (first and first.start() < error.start):
+                return 'utf-8'
+            return detect_single_byte_encoding(chunk)
+        utf8_seen = utf8_seen or len(text.encode('utf-8')) != len(text)
+    pending = decoder.getstate()[0]
+    if final and pending and not utf8_seen:
+        return detect_single_byte_encoding(pending)
+    return 'utf-8'
+
+
+def scan_encoding(table_file, chunk_size=SAMPLE_SIZE):
+    """
+    Detect encoding of a whole table without BOM, see detect_text_encoding.
+
+    Args:
+        table_file: Table file opened in binary mode.
+        chunk_size: Number of bytes read at once.
+
+    Returns:
+        String codec name.
+    """
+    return detect_text_encoding(
+        iter(lambda: table_file.read(chunk_size), b'')
+    )
+
+
+def detect_table_format(path, sample_size=SAMPLE_SIZE, full_scan=False):
+    """
+    Detect encoding and CSV dialect of a table.
+
+    Args:
+        path: Path to the CSV file.
+        sample_size: Number of bytes inspected.
+        full_scan: Scan all non-ASCII bytes of the table if the sample is
+            UTF-8, the whole table is read, see scan_encoding.
+
+    Returns:
+        TableFormat descriptor.
+    """
+    with open(path, 'rb') as table_file:
+        sample = table_file.read(sample_size)
+        complete = len(sample) < sample_size
+        encoding = detect_encoding(sample)
+        if encoding == 'utf-8' and full_scan and not complete:
+            table_file.seek(0)
+            encoding = scan_encoding(table_file, sample_size)
+    decoder = codecs.getincrementaldecoder(encoding)(errors='ignore')
+    text = decoder.decode(sample, complete)
+    if len(text) > DIALECT_SAMPLE_SIZE or not complete:
+        text = text[:DIALECT_SAMPLE_SIZE]
+        if '\n' in text:
+            # drop the last, possibly incomplete row
+            text = text[:text.rindex('\n') + 1]
+    if encoding in ('utf-8', 'utf-8-sig', 'cp1252'):
+        errors = FALLBACK_ERRORS
+    else:
+        errors = 'strict'
+    return TableFormat(encoding=encoding, errors=errors,
+                       dialect=detect_dialect(text))
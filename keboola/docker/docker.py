@@ -10,6 +10,12 @@ import argparse
 import json
 import os
 import csv
+import itertools
+from .descriptors import (
+    InputTable, OutputTable, InputFile, TableManifest, FileManifest
+)
+from .dialect import detect_table_format
+from .columnar import get_columnar_table, get_source_stamp
 
 
 class Config(object):
@@ -20,10 +26,27 @@ class Config(object):
     https://developers.keboola.com/extend/common-interface/config-file/
     and https://developers.keboola.com/extend/common-interface/manifest-files/
     """
-    def __init__(self, data_dir=''):
+    def __init__(self, data_dir='', columnar_cache_dir=None,
+                 full_encoding_scan=False):
+        """
+        Args:
+            data_dir: Data directory, if not set, it is taken from the -d
+                argument or KBC_DATADIR environment variable.
+            columnar_cache_dir: Scratch directory for the columnar cache of
+                input tables, the cache is disabled if not set.
+            full_encoding_scan: Detect encoding of input tables from all
+                their non-ASCII bytes, not only from a sample. Each table
+                is read twice, see dialect.detect_table_format.
+        """
         self.register_csv_dialect()
         self.config_data = []
         self.data_dir = ''
+        self._input_files = None
+        self._manifests = {}
+        self._table_formats = {}
+        self._columnar_tables = {}
+        self.columnar_cache_dir = columnar_cache_dir
+        self.full_encoding_scan = full_encoding_scan
         if data_dir == '' or data_dir is None:
             argparser = argparse.ArgumentParser()
             argparser.add_argument(
@@ -54,6 +77,21 @@ class Config(object):
                 "Dir: " + self.data_dir
             )
 
+    @property
+    def config_data(self):
+        """
+        Parsed configuration file. Assigning a new value resets the cached
+        input and output tables, changes made to the value in place are not
+        reflected in them.
+        """
+        return self._config_data
+
+    @config_data.setter
+    def config_data(self, config_data):
+        self._config_data = config_data
+        self._input_tables = None
+        self._output_tables = None
+
     @staticmethod
     def register_csv_dialect():
         """
@@ -266,14 +304,29 @@ class Config(object):
         Returns:
             List with file names.
         """
-        files_path = os.path.join(self.data_dir, 'in', 'files')
-        files = []
-        for file in os.listdir(files_path):
-            if (os.path.isfile(os.path.join(files_path, file)) and
-                    file[-9:] != '.manifest') and file[:1] != '.':
-                files.append(os.path.join(files_path, file))
-        files.sort()
-        return files
+        return [file.full_path for file in self.get_input_file_descriptors()]
+
+    def get_input_file_descriptors(self):
+        """
+        Get input files present in the data directory. The directory is
+        listed only once, subsequent calls return the cached descriptors.
+
+        Returns:
+            List of InputFile descriptors sorted by full_path, use
+            to_dict() to get plain dictionaries.
+        """
+        if self._input_files is None:
+            files_path = os.path.join(self.data_dir, 'in', 'files')
+            files = []
+            for file in os.listdir(files_path):
+                full_path = os.path.join(files_path, file)
+                if (os.path.isfile(full_path) and
+                        file[-9:] != '.manifest') and file[:1] != '.':
+                    files.append(InputFile(file_name=file,
+                                           full_path=full_path))
+            files.sort(key=lambda item: item.full_path)
+            self._input_files = tuple(files)
+        return list(self._input_files)
 
     def get_file_manifest(self, file_name):
         """
@@ -283,16 +336,32 @@ class Config(object):
             file_name: Destination file name (without .manifest extension)
 
         Returns:
-            List with manifest options.
+            FileManifest with manifest options. The manifest is read-only,
+            use to_dict() to get a dictionary which can be modified or
+            serialized to JSON.
         """
         file_name = os.path.normpath(file_name)
         base_dir = os.path.normpath(os.path.join(self.data_dir, 'in', 'files'))
         if file_name[0:len(base_dir)] != base_dir:
             file_name = os.path.join(base_dir, file_name)
+        return self._load_manifest(file_name + '.manifest', FileManifest)
 
-        with open(file_name + '.manifest') as manifest_file:
-            manifest = json.load(manifest_file)
-        return manifest
+    def _load_manifest(self, manifest_path, descriptor_class):
+        """
+        Load manifest file, manifests are read only once and cached.
+
+        Args:
+            manifest_path: Path to the manifest file.
+            descriptor_class: Descriptor class of the manifest.
+
+        Returns:
+            Instance of descriptor_class.
+        """
+        if manifest_path not in self._manifests:
+            with open(manifest_path) as manifest_file:
+                self._manifests[manifest_path] = \
+                    descriptor_class(json.load(manifest_file))
+        return self._manifests[manifest_path]
 
     def get_expected_output_files(self):
         """
@@ -302,12 +371,7 @@ class Config(object):
         Returns:
             List with dictionaries with output file properties.
         """
-        if (('storage' in self.config_data) and
-                ('output' in self.config_data['storage']) and
-                ('files' in self.config_data['storage']['output'])):
-            files = self.config_data['storage']['output']['files']
-            return files
-        return []
+        return self._get_storage_mapping('output', 'files')
 
     def get_input_tables(self):
         """
@@ -315,23 +379,25 @@ class Config(object):
         Tables are identified by their destination (.csv file) or full_path.
 
         Returns:
-            List of dictionaries with output tables properties.
-        """
-        if (('storage' in self.config_data) and
-                ('input' in self.config_data['storage']) and
-                ('tables' in self.config_data['storage']['input'])):
-            tables = self.config_data['storage']['input']['tables']
-            for table in tables:
-                table['full_path'] = os.path.normpath(
+            List of InputTable descriptors with input tables properties.
+            Descriptors are read-only, use to_dict() to get dictionaries
+            which can be modified or serialized to JSON. Descriptors are
+            built on the first call and cached until config_data is
+            reassigned, in place changes of config_data are ignored.
+        """
+        if self._input_tables is None:
+            self._input_tables = tuple(
+                InputTable(table, full_path=os.path.normpath(
                     os.path.join(
                         self.data_dir,
                         'in',
                         'tables',
                         table['destination']
                     )
-                )
-            return tables
-        return []
+                ))
+                for table in self._get_storage_mapping('input', 'tables')
+            )
+        return list(self._input_tables)
 
     def get_table_manifest(self, table_name):
         """
@@ -341,7 +407,9 @@ class Config(object):
             table_name: Destination table name (name of .csv file).
 
         Returns:
-            List with manifest options.
+            TableManifest with manifest options. The manifest is read-only,
+            use to_dict() to get a dictionary which can be modified or
+            serialized to JSON.
         """
         manifest_path = os.path.join(
             self.data_dir,
@@ -349,9 +417,209 @@ class Config(object):
             'tables',
             table_name + '.manifest'
         )
-        with open(manifest_path) as manifest_file:
-            manifest = json.load(manifest_file)
-        return manifest
+        return self._load_manifest(manifest_path, TableManifest)
+
+    def get_input_table_format(self, table_name):
+        """
+        Get encoding and CSV dialect of an input table. The format is
+        detected from a sample of the table, or from the whole table if
+        full_encoding_scan is set, and cached.
+
+        Args:
+            table_name: Destination table name (name of .csv file).
+
+        Returns:
+            TableFormat with encoding, errors and dialect properties.
+        """
+        if table_name not in self._table_formats:
+            self._table_formats[table_name] = detect_table_format(
+                os.path.join(self.data_dir, 'in', 'tables', table_name),
+                full_scan=self.full_encoding_scan
+            )
+        return self._table_formats[table_name]
+
+    def open_input_table(self, table_name):
+        """
+        Open input table for reading with the detected encoding. Bytes
+        invalid in the encoding are decoded as cp1252 or latin-1.
+
+        Args:
+            table_name: Destination table name (name of .csv file).
+
+        Returns:
+            Text file object, to be passed to csv.reader
+            with the detected dialect.
+        """
+        table_format = self.get_input_table_format(table_name)
+        return open(
+            os.path.join(self.data_dir, 'in', 'tables', table_name),
+            'r',
+            encoding=table_format.encoding,
+            errors=table_format.errors,
+            newline=''
+        )
+
+    def read_input_table(self, table_name, columns=None):
+        """
+        Read rows of an input table with the detected encoding and dialect.
+        If the columnar cache is enabled, the rows are read from the cache.
+        Rows are streamed in both cases, the whole table is never held
+        in memory.
+
+        Args:
+            table_name: Destination table name (name of .csv file).
+            columns: List of column names to read, all if not set.
+
+        Returns:
+            Iterator of rows, each row is a list of strings. The first row
+            contains column names from the table manifest, or the first row
+            of the CSV file if the manifest has no columns.
+        """
+        table = self.get_columnar_table(table_name)
+        if table is not None:
+            return table.read(columns)
+        rows = self._read_table_rows(table_name)
+        if columns is None:
+            return rows
+        return self._project_rows(rows, columns)
+
+    def get_input_table_columns(self, table_name, columns=None):
+        """
+        Read values of input table columns.
+
+        Args:
+            table_name: Destination table name (name of .csv file).
+            columns: List of column names to read, all if not set.
+
+        Returns:
+            Dict with lists of values indexed by column name.
+        """
+        table = self.get_columnar_table(table_name)
+        if table is not None:
+            result = {}
+            for name in (table.columns if columns is None else columns):
+                if name not in result:
+                    result[name] = table.column(name)
+            return result
+        rows = self.read_input_table(table_name, columns)
+        header = next(rows, [])
+        values = list(map(list, zip(*rows))) or [[] for _ in header]
+        result = {}
+        for name, column_values in zip(header, values):
+            result.setdefault(name, column_values)
+        return result
+
+    def get_columnar_table(self, table_name):
+        """
+        Get input table converted to the columnar cache. The table is
+        converted on first access, column names are taken from the table
+        manifest, or from the first row of the CSV file if the manifest
+        has no columns.
+
+        Args:
+            table_name: Destination table name (name of .csv file).
+
+        Returns:
+            ColumnarTable, None if the cache is disabled or the table
+            cannot be stored in it, e.g. if it contains NUL characters.
+        """
+        if self.columnar_cache_dir is None:
+            return None
+        if table_name not in self._columnar_tables:
+            source_stamp = get_source_stamp(
+                os.path.join(self.data_dir, 'in', 'tables', table_name),
+                self._get_manifest_columns(table_name),
+                self.get_input_table_format(table_name)
+            )
+            try:
+                table = get_columnar_table(
+                    os.path.join(self.columnar_cache_dir, table_name),
+                    source_stamp,
+                    lambda: self._read_table_rows(table_name)
+                )
+            except (ValueError, csv.Error):
+                # csv before Python 3.11 raises csv.Error for NUL characters
+                table = None
+            self._columnar_tables[table_name] = table
+        return self._columnar_tables[table_name]
+
+    def _read_table_rows(self, table_name):
+        """
+        Read rows of an input table CSV file with column names in the first
+        row. Column names are taken from the table manifest, the first row
+        of the CSV file is skipped if it is equal to them, otherwise it is
+        data of a headless table. Without columns in the manifest, the first
+        row of the CSV file contains column names.
+
+        Args:
+            table_name: Destination table name (name of .csv file).
+
+        Returns:
+            Iterator of rows, each row is a list of strings.
+        """
+        rows = self._read_csv_table(table_name)
+        columns = self._get_manifest_columns(table_name)
+        if not columns:
+            return rows
+        first = next(rows, None)
+        if first is None or first == columns:
+            return itertools.chain([columns], rows)
+        return itertools.chain([columns, first], rows)
+
+    def _get_manifest_columns(self, table_name):
+        """
+        Get column names from the table manifest.
+
+        Args:
+            table_name: Destination table name (name of .csv file).
+
+        Returns:
+            List of column names, None if the manifest does not exist
+            or has no columns.
+        """
+        try:
+            columns = self.get_table_manifest(table_name).get('columns')
+        except (OSError, IOError):
+            return None
+        return list(columns) if columns else None
+
+    def _read_csv_table(self, table_name):
+        """
+        Read rows of an input table CSV file, blank lines are skipped.
+
+        Args:
+            table_name: Destination table name (name of .csv file).
+
+        Returns:
+            Generator of rows, each row is a list of strings.
+        """
+        dialect = self.get_input_table_format(table_name).dialect
+        with self.open_input_table(table_name) as table_file:
+            # csv.reader returns an empty list for a blank line
+            yield from filter(None, csv.reader(table_file, dialect=dialect))
+
+    @staticmethod
+    def _project_rows(rows, columns):
+        """
+        Select columns from rows, the first row contains column names.
+
+        Args:
+            rows: Iterator of rows.
+            columns: List of column names.
+
+        Returns:
+            Iterator of rows with selected columns.
+        """
+        header = next(rows, [])
+        indexes = []
+        for name in columns:
+            if name not in header:
+                raise ValueError("Column " + name + " not found")
+            indexes.append(header.index(name))
+        return itertools.chain(
+            [list(columns)],
+            ([row[index] for index in indexes] for row in rows)
+        )
 
     def get_expected_output_tables(self):
         """
@@ -359,20 +627,40 @@ class Config(object):
         when the application finishes.
 
         Returns:
-            List of dictionaries with expected output tables.
-        """
-        if (('storage' in self.config_data) and
-                ('output' in self.config_data['storage']) and
-                ('tables' in self.config_data['storage']['output'])):
-            tables = self.config_data['storage']['output']['tables']
-            for table in tables:
-                table['full_path'] = os.path.join(
+            List of OutputTable descriptors with expected output tables.
+            Descriptors are read-only, use to_dict() to get dictionaries
+            which can be modified or serialized to JSON. Descriptors are
+            built on the first call and cached until config_data is
+            reassigned, in place changes of config_data are ignored.
+        """
+        if self._output_tables is None:
+            self._output_tables = tuple(
+                OutputTable(table, full_path=os.path.join(
                     self.data_dir,
                     'out',
                     'tables',
                     table['source']
-                )
-            return tables
+                ))
+                for table in self._get_storage_mapping('output', 'tables')
+            )
+        return list(self._output_tables)
+
+    def _get_storage_mapping(self, direction, kind):
+        """
+        Get table or file mappings from the storage section of
+        the configuration file.
+
+        Args:
+            direction: Either 'input' or 'output'.
+            kind: Either 'tables' or 'files'.
+
+        Returns:
+            List of dictionaries with mappings.
+        """
+        if (('storage' in self.config_data) and
+                (direction in self.config_data['storage']) and
+                (kind in self.config_data['storage'][direction])):
+            return self.config_data['storage'][direction][kind]
         return []
 
     def get_data_dir(self):
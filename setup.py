@@ -1,8 +1,8 @@
-from distutils.core import setup
-
-setup(
-    name='Keboola',
-    version='2.2.0',
-    url='https://github.com/keboola/python-docker-application',
-    packages=['keboola.docker']
-)
+from distutils.core import setup
+
+setup(
+    name='Keboola',
+    version='3.0.0',
+    url='https://github.com/keboola/python-docker-application',
+    packages=['keboola.docker']
+)
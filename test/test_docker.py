@@ -3,7 +3,11 @@ import os
 import json
 import tempfile
 import csv
+import pickle
+import sys
 from keboola import docker
+from keboola.docker.columnar import ColumnarTable
+from keboola.docker.dialect import detect_table_format
 
 
 class TestDockerConfig(unittest.TestCase):
@@ -213,6 +217,291 @@ class TestDockerConfig(unittest.TestCase):
                 self.assertEqual('in.c-main.test2', table['source'])
                 self.assertTrue(os.path.isfile(table['full_path']))
 
+    def test_input_tables_descriptors(self):
+        cfg = docker.Config()
+        tables = cfg.get_input_tables()
+        self.assertIsInstance(tables[0], docker.InputTable)
+        self.assertEqual('sample.csv', tables[0].destination)
+        self.assertEqual('eq', tables[0].get('where_operator'))
+        self.assertNotIn('limit', tables[0])
+        self.assertIsNone(tables[0].get('limit'))
+        with self.assertRaises(KeyError):
+            tables[0]['limit']
+        with self.assertRaises(AttributeError):
+            tables[0].destination = 'other.csv'
+        self.assertIs(tables[0], cfg.get_input_tables()[0])
+        self.assertNotIn('full_path',
+                         cfg.config_data['storage']['input']['tables'][0])
+
+    def test_input_tables_cache_reset(self):
+        cfg = docker.Config()
+        self.assertEqual(2, len(cfg.get_input_tables()))
+        self.assertEqual(2, len(cfg.get_expected_output_tables()))
+        cfg.config_data = {}
+        self.assertEqual([], cfg.get_input_tables())
+        self.assertEqual([], cfg.get_expected_output_tables())
+
+    def test_descriptor_extra_properties(self):
+        table = docker.OutputTable({'source': 'a.csv', 'foo': 'bar'},
+                                   full_path='/data/out/tables/a.csv')
+        self.assertEqual({'source': 'a.csv', 'foo': 'bar',
+                          'full_path': '/data/out/tables/a.csv'}, table)
+        self.assertEqual(3, len(table))
+        self.assertEqual(table, pickle.loads(pickle.dumps(table)))
+
+    def test_descriptor_nested_values(self):
+        cfg = docker.Config()
+        manifest = cfg.get_table_manifest('fooBar')
+        with self.assertRaises(TypeError):
+            manifest['columns'].append('foo')
+        self.assertEqual(['id', 'timestamp'],
+                         cfg.get_table_manifest('fooBar')['columns'])
+        with self.assertRaises(TypeError):
+            json.dumps(manifest)
+        manifest_dict = manifest.to_dict()
+        manifest_dict['columns'].append('foo')
+        self.assertEqual('in.c-main.test2',
+                         json.loads(json.dumps(manifest_dict))['id'])
+        self.assertEqual(['id', 'timestamp'], manifest['columns'])
+
+    def test_input_file_descriptors(self):
+        cfg = docker.Config()
+        files = cfg.get_input_file_descriptors()
+        self.assertEqual(len(files), 5)
+        self.assertEqual('151971405_21702.strip.print.gif',
+                         files[0].file_name)
+        self.assertEqual(cfg.get_input_files()[0], files[0]['full_path'])
+
+    def test_input_table_format_kbc(self):
+        cfg = docker.Config()
+        table_format = cfg.get_input_table_format('sample.csv')
+        self.assertEqual({'encoding': 'utf-8', 'errors': 'kbc-fallback',
+                          'dialect': 'kbc'}, table_format)
+        self.assertIs(table_format, cfg.get_input_table_format('sample.csv'))
+        rows = list(cfg.read_input_table('sample.csv'))
+        self.assertEqual(401, len(rows))
+        self.assertEqual('Sales', rows[0][1])
+
+    def test_input_table_format_detected(self):
+        data_dir = tempfile.mkdtemp('kbc-test')
+        os.makedirs(os.path.join(data_dir, 'in', 'tables'))
+        with open(os.path.join(data_dir, 'config.json'), 'w') as config_file:
+            json.dump({}, config_file)
+        tables = {
+            'bom.csv': ('utf-8-sig', ',', 'utf-8-sig'),
+            'utf16.csv': ('utf-16', ';', 'utf-16'),
+            'cp1252.csv': ('cp1252', ';', 'cp1252'),
+            'tab.csv': ('utf-8', '\t', 'utf-8')
+        }
+        for name, (encoding, delimiter, _) in tables.items():
+            with open(os.path.join(data_dir, 'in', 'tables', name), 'w',
+                      encoding=encoding, newline='') as table_file:
+                writer = csv.writer(table_file, delimiter=delimiter,
+                                    lineterminator='\n')
+                writer.writerow(['id', 'name'])
+                writer.writerow(['1', 'Crème brûlée "a"' + delimiter])
+                writer.writerow(['2', 'café'])
+        cfg = docker.Config(data_dir)
+        for name, (_, delimiter, encoding) in tables.items():
+            table_format = cfg.get_input_table_format(name)
+            self.assertEqual(encoding, table_format.encoding)
+            if delimiter == ',':
+                self.assertEqual('kbc', table_format.dialect)
+            else:
+                self.assertEqual(delimiter, table_format.dialect.delimiter)
+            rows = list(cfg.read_input_table(name))
+            self.assertEqual(['id', 'name'], rows[0])
+            self.assertEqual(['2', 'café'], rows[2])
+            self.assertEqual('Crème brûlée "a"' + delimiter, rows[1][1])
+
+    def test_input_table_format_non_ascii_tail(self):
+        some_file = os.path.join(tempfile.mkdtemp('kbc-test')
+                                 + 'some-table.csv')
+        with open(some_file, 'w', encoding='cp1252') as table_file:
+            table_file.write('"id","name"\n' + '"1","foo"\n' * 100 +
+                             '"2","café"\n')
+        self.assertEqual('utf-8',
+                         detect_table_format(some_file, 64).encoding)
+        table_format = detect_table_format(some_file, 64, full_scan=True)
+        self.assertEqual('cp1252', table_format.encoding)
+
+    def test_input_table_mixed_encoding(self):
+        data_dir = tempfile.mkdtemp('kbc-test')
+        os.makedirs(os.path.join(data_dir, 'in', 'tables'))
+        with open(os.path.join(data_dir, 'config.json'), 'w') as config_file:
+            json.dump({}, config_file)
+        padding = b'"1","foo"\n' * 10000
+        tables = {
+            'sample.csv': b'"id","name"\n"1","caf\xc3\xa9"\n'
+                          b'"2","caf\xe9"\n' + padding,
+            'tail.csv': b'"id","name"\n"1","caf\xc3\xa9"\n' + padding +
+                        b'"2","caf\xe9"\n',
+            'ascii.csv': b'"id","name"\n' + padding +
+                         b'"1","caf\xc3\xa9"\n"2","caf\xe9"\n'
+        }
+        for name, data in tables.items():
+            with open(os.path.join(data_dir, 'in', 'tables', name),
+                      'wb') as table_file:
+                table_file.write(data)
+        for full_scan in (False, True):
+            cfg = docker.Config(data_dir, full_encoding_scan=full_scan)
+            for name in tables:
+                self.assertEqual('utf-8',
+                                 cfg.get_input_table_format(name).encoding)
+                values = [row[1] for row in cfg.read_input_table(name)
+                          if row[1] != 'foo']
+                self.assertEqual(['name', 'café', 'café'], values)
+
+    def test_input_table_format_bom_in_tail(self):
+        some_file = os.path.join(tempfile.mkdtemp('kbc-test')
+                                 + 'some-table.csv')
+        with open(some_file, 'wb') as table_file:
+            table_file.write(b'"id","name"\n' + b'"1","foo"\n' * 100 +
+                             b'"2","\xff\xfe"\n')
+        table_format = detect_table_format(some_file, 64, full_scan=True)
+        self.assertEqual('cp1252', table_format.encoding)
+
+    def test_columnar_cache(self):
+        cache_dir = tempfile.mkdtemp('kbc-test')
+        cfg = docker.Config(columnar_cache_dir=cache_dir)
+        plain_cfg = docker.Config()
+        self.assertIsNone(plain_cfg.get_columnar_table('sample.csv'))
+        table = cfg.get_columnar_table('sample.csv')
+        self.assertEqual(400, table.rows_count)
+        self.assertEqual(list(plain_cfg.read_input_table('sample.csv')),
+                         list(cfg.read_input_table('sample.csv')))
+        self.assertEqual(
+            list(plain_cfg.read_input_table('sample.csv', ['US', 'x'])),
+            list(cfg.read_input_table('sample.csv', ['US', 'x']))
+        )
+        self.assertEqual(
+            plain_cfg.get_input_table_columns('sample.csv', ['Sales']),
+            cfg.get_input_table_columns('sample.csv', ['Sales'])
+        )
+        self.assertEqual({'id': [], 'timestamp': []},
+                         cfg.get_input_table_columns('fooBar'))
+        with self.assertRaises(ValueError):
+            cfg.read_input_table('sample.csv', ['foo'])
+        with self.assertRaises(ValueError):
+            plain_cfg.read_input_table('sample.csv', ['foo'])
+        meta_path = os.path.join(cache_dir, 'sample.csv', 'meta.json')
+        mtime = os.stat(meta_path).st_mtime_ns
+        docker.Config(columnar_cache_dir=cache_dir).get_columnar_table(
+            'sample.csv')
+        self.assertEqual(mtime, os.stat(meta_path).st_mtime_ns)
+
+    @staticmethod
+    def create_data_dir(tables, manifests=None):
+        data_dir = tempfile.mkdtemp('kbc-test')
+        tables_dir = os.path.join(data_dir, 'in', 'tables')
+        os.makedirs(tables_dir)
+        with open(os.path.join(data_dir, 'config.json'), 'w') as config_file:
+            json.dump({}, config_file)
+        for name, data in tables.items():
+            with open(os.path.join(tables_dir, name), 'w') as table_file:
+                table_file.write(data)
+        for name, manifest in (manifests or {}).items():
+            with open(os.path.join(tables_dir, name + '.manifest'),
+                      'w') as manifest_file:
+                json.dump(manifest, manifest_file)
+        return data_dir
+
+    def test_columnar_cache_not_supported(self):
+        cache_dir = tempfile.mkdtemp('kbc-test')
+        path = os.path.join(cache_dir, 'table')
+        with self.assertRaises(ValueError):
+            ColumnarTable.create(path, iter([['id', 'name'],
+                                             ['1', 'a\x00b']]))
+        with self.assertRaises(ValueError):
+            ColumnarTable.create(path, iter([['id', 'name'], ['1']]))
+        self.assertEqual([], os.listdir(cache_dir))
+        data_dir = self.create_data_dir(
+            {'nul.csv': '"id","name"\n"1","a\x00b"\n"2",""\n'}
+        )
+        cfg = docker.Config(data_dir, columnar_cache_dir=cache_dir)
+        self.assertIsNone(cfg.get_columnar_table('nul.csv'))
+        if sys.version_info >= (3, 11):
+            # older csv module does not accept NUL characters at all
+            self.assertEqual({'id': ['1', '2'], 'name': ['a\x00b', '']},
+                             cfg.get_input_table_columns('nul.csv'))
+
+    def test_columnar_cache_stamp(self):
+        data_dir = self.create_data_dir({'h.csv': '1,2\n3,4\n'},
+                                        {'h.csv': {'columns': ['x', 'y']}})
+        cache_dir = tempfile.mkdtemp('kbc-test')
+        cfg = docker.Config(data_dir, columnar_cache_dir=cache_dir)
+        self.assertEqual(['x', 'y'], next(cfg.read_input_table('h.csv')))
+        with open(os.path.join(data_dir, 'in', 'tables', 'h.csv.manifest'),
+                  'w') as manifest_file:
+            json.dump({'columns': ['p', 'q']}, manifest_file)
+        cfg = docker.Config(data_dir, columnar_cache_dir=cache_dir)
+        self.assertEqual([['p', 'q'], ['1', '2'], ['3', '4']],
+                         list(cfg.read_input_table('h.csv')))
+        other_dir = self.create_data_dir({'h.csv': 'a;b\n5;6\n'})
+        cfg = docker.Config(other_dir, columnar_cache_dir=cache_dir)
+        self.assertEqual([['a', 'b'], ['5', '6']],
+                         list(cfg.read_input_table('h.csv')))
+
+    def test_columnar_cache_empty_projection_and_blank_lines(self):
+        data_dir = self.create_data_dir(
+            {'blank.csv': 'a,b\n1,2\n\n3,4\n\n'}
+        )
+        plain_cfg = docker.Config(data_dir)
+        cfg = docker.Config(data_dir,
+                            columnar_cache_dir=tempfile.mkdtemp('kbc-test'))
+        self.assertIsNotNone(cfg.get_columnar_table('blank.csv'))
+        for config in (plain_cfg, cfg):
+            self.assertEqual([['a', 'b'], ['1', '2'], ['3', '4']],
+                             list(config.read_input_table('blank.csv')))
+            self.assertEqual([[], [], []],
+                             list(config.read_input_table('blank.csv', [])))
+            self.assertEqual({}, config.get_input_table_columns('blank.csv',
+                                                                []))
+
+    def test_columnar_cache_header(self):
+        data_dir = tempfile.mkdtemp('kbc-test')
+        tables_dir = os.path.join(data_dir, 'in', 'tables')
+        os.makedirs(tables_dir)
+        with open(os.path.join(data_dir, 'config.json'), 'w') as config_file:
+            json.dump({}, config_file)
+        with open(os.path.join(tables_dir, 'headless.csv'),
+                  'w') as table_file:
+            table_file.write('1,2\n3,4\n')
+        with open(os.path.join(tables_dir, 'headless.csv.manifest'),
+                  'w') as manifest_file:
+            json.dump({'columns': ['x', 'y']}, manifest_file)
+        with open(os.path.join(tables_dir, 'duplicate.csv'),
+                  'w') as table_file:
+            table_file.write('a,a,b\n1,2,3\n')
+        plain_cfg = docker.Config(data_dir)
+        cfg = docker.Config(data_dir,
+                            columnar_cache_dir=tempfile.mkdtemp('kbc-test'))
+        for config in (plain_cfg, cfg):
+            self.assertEqual([['x', 'y'], ['1', '2'], ['3', '4']],
+                             list(config.read_input_table('headless.csv')))
+            self.assertEqual([['a', 'a', 'b'], ['1', '2', '3']],
+                             list(config.read_input_table('duplicate.csv')))
+            self.assertEqual(
+                [['b', 'a'], ['3', '1']],
+                list(config.read_input_table('duplicate.csv', ['b', 'a']))
+            )
+            self.assertEqual({'a': ['1'], 'b': ['3']},
+                             config.get_input_table_columns('duplicate.csv'))
+        self.assertIsNotNone(cfg.get_columnar_table('duplicate.csv'))
+
+    def test_columnar_table_chunks(self):
+        rows = [['id', 'name']] + [[str(i), 'ř' * (i % 3)] for i in range(7)]
+        table = ColumnarTable.create(
+            os.path.join(tempfile.mkdtemp('kbc-test'), 'table'),
+            iter(rows), chunk_size=2
+        )
+        self.assertEqual(7, table.rows_count)
+        self.assertEqual(rows, list(table.read()))
+        self.assertEqual([row[1] for row in rows[1:]], table.column('name'))
+        reader = table.read(['name'])
+        self.assertEqual(['name'], next(reader))
+        self.assertEqual([''], next(reader))
+
     def test_get_table_manifest_csv(self):
         cfg = docker.Config()
         table1 = cfg.get_table_manifest('sample.csv')